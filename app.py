@@ -1,15 +1,23 @@
-import copy
 import io
 import os
 import re
-import json
+import time
+import bisect
+import hashlib
 import shutil
-import datetime
+import zipfile
+import tempfile
+import functools
+import orjson
+from xml.sax.saxutils import escape as xml_escape
 from lxml import etree
 from flask import Flask, request, jsonify, render_template, send_file
 from werkzeug.utils import secure_filename
 from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
 from pptx.oxml.ns import qn
+from pptx.util import Inches, Pt
+from pptx.dml.color import RGBColor
 
 app = Flask(__name__)
 
@@ -21,6 +29,33 @@ ALLOWED_EXTENSIONS = {"pptx"}
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50 MB
 
+# python-pptx hard-codes DEFLATE level 6 when zipping the package on save;
+# level 1 is several times faster for ~10% larger files. Tunable via env.
+# Its writer reaches ZipFile through the `zipfile` module global in
+# pptx/opc/serialized.py, so rebind that name to a shim whose ZipFile
+# defaults to the configured level (everything else falls through).
+_PPTX_ZIP_LEVEL = int(os.environ.get("PPTX_ZIP_LEVEL", "1"))
+
+
+class _ZipfileShim:
+    """stdlib zipfile, with ZipFile defaulting to _PPTX_ZIP_LEVEL."""
+
+    ZipFile = staticmethod(
+        functools.partial(zipfile.ZipFile, compresslevel=_PPTX_ZIP_LEVEL)
+    )
+
+    def __getattr__(self, name):
+        return getattr(zipfile, name)
+
+
+try:
+    from pptx.opc import serialized as _pptx_serialized
+
+    if isinstance(getattr(_pptx_serialized, "zipfile", None), type(zipfile)):
+        _pptx_serialized.zipfile = _ZipfileShim()
+except ImportError:  # pragma: no cover - older python-pptx layout
+    pass
+
 
 # ── Helpers ────────────────────────────────────────────────────────────────────
 def allowed_file(filename: str) -> bool:
@@ -36,21 +71,124 @@ def placeholder_type_name(ph_type) -> str:
         return str(ph_type)
 
 
+def _now_iso() -> str:
+    """Local timestamp in isoformat(timespec='seconds') shape, without the
+    datetime object allocation."""
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+# (epoch second, formatted) — download names only need second resolution
+_stamp_cache: tuple = (0, "")
+
+
+def _download_stamp() -> str:
+    """Timestamp for generated download names, reformatted at most once a
+    second instead of allocating a datetime per request."""
+    global _stamp_cache
+    now = int(time.time())
+    if _stamp_cache[0] != now:
+        _stamp_cache = (now, time.strftime("%Y%m%d_%H%M%S"))
+    return _stamp_cache[1]
+
+
+def _read_json(path: str):
+    """Read and parse a JSON file in one shot (single read(), in-memory parse)."""
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def _write_json(path: str, obj) -> None:
+    """Write *obj* as indented JSON atomically: one write() to a temp file,
+    then rename over the target so readers never see a partial file."""
+    payload = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+# path → (st_mtime_ns, parsed JSON)
+_JSON_CACHE: dict = {}
+
+
+def _load_json_cached(path: str):
+    """Parse a JSON file, reusing the cached result until the file's mtime changes."""
+    st = os.stat(path)
+    cached = _JSON_CACHE.get(path)
+    if cached is not None and cached[0] == st.st_mtime_ns:
+        return cached[1]
+    data = _read_json(path)
+    _JSON_CACHE[path] = (st.st_mtime_ns, data)
+    return data
+
+
+def _json_response(obj):
+    """Serialize *obj* with orjson directly, skipping jsonify's re-encode."""
+    return app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+
+def _file_etag(path: str) -> str:
+    """Weak ETag derived from a file's mtime and size."""
+    st = os.stat(path)
+    return f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _conditional_json_file(path: str, data=None):
+    """Serve a JSON file with an ETag; answer 304 when If-None-Match matches."""
+    etag = _file_etag(path)
+    if request.headers.get("If-None-Match") == etag:
+        return "", 304
+    resp = _json_response(data if data is not None else _load_json_cached(path))
+    resp.headers["ETag"] = etag
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
 # ── Routes ───────────────────────────────────────────────────────────────────
 
+# Names made of these characters (no leading/trailing '.' or '_') pass
+# through secure_filename unchanged, so they can skip its regex passes.
+_SAFE_NAME_RE = re.compile(r"[A-Za-z0-9-](?:[A-Za-z0-9_.-]*[A-Za-z0-9-])?\Z")
+
+
+@functools.lru_cache(maxsize=1024)
+def _secure_name(name: str) -> str:
+    """secure_filename with a fast path for names that are already safe;
+    memoized since the same names repeat heavily within a session."""
+    if _SAFE_NAME_RE.match(name):
+        return name
+    return secure_filename(name)
+
+
+@functools.lru_cache(maxsize=256)
+def _safe_stem(name: str) -> str:
+    """Sanitized filename stem; cached since the same names repeat per session."""
+    return os.path.splitext(_secure_name(name))[0]
+
+
+def _schema_path_for_stem(stem: str) -> str:
+    """Sidecar schema path for an already-sanitized filename stem."""
+    return os.path.join(UPLOAD_FOLDER, f"{stem}.schema.json")
+
+
 def _schema_json_path(pptx_filename: str) -> str:
     """Return the path to the sidecar schema JSON for a given PPTX filename."""
-    stem = os.path.splitext(secure_filename(pptx_filename))[0]
-    return os.path.join(app.config["UPLOAD_FOLDER"], f"{stem}.schema.json")
+    return _schema_path_for_stem(_safe_stem(pptx_filename))
 
 
 # ── Paths ─────────────────────────────────────────────────────────────────────
 MASTER_SLIDE_PATH    = os.path.join(BASE_DIR, "master_slide.pptx")
+MASTER_SCHEMA_PATH   = os.path.join(BASE_DIR, "master_slide.schema.json")
 BUILTIN_MASTER_DIR   = os.path.join(BASE_DIR, "master_slide")      # .pptx files
 BUILTIN_PROFILES_DIR = os.path.join(BASE_DIR, "builtin_profiles")  # pre-scanned JSONs
 PROMPT_TEMPLATE_PATH = os.path.join(BASE_DIR, "prompt_template.json")
 AI_PROMPTS_PATH      = os.path.join(BASE_DIR, "ai_prompts.json")
 
+PPTX_MIME = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+# characters not allowed in a builtin template slug
+_SLUG_RE = re.compile(r"[^a-zA-Z0-9_-]")
+
 DEFAULT_PROMPT_TEMPLATE = """Tôi có một file PowerPoint template (.pptx) tên là \"{filename}".
 Tôi cần bạn tạo schema JSON mô tả cấu trúc layouts của file này để dùng tự động generate slide.
 
@@ -85,6 +223,15 @@ Yêu cầu:
 4. Chỉ trả về JSON hợp lệ"""
 
 
+@app.before_request
+def _reject_oversized_body():
+    """Refuse requests whose declared Content-Length exceeds the cap before
+    any of the body is read or parsed."""
+    cl = request.content_length
+    if cl is not None and cl > app.config["MAX_CONTENT_LENGTH"]:
+        return jsonify({"error": "Request body too large."}), 413
+
+
 @app.route("/")
 def index():
     """Serve the main upload page."""
@@ -92,25 +239,40 @@ def index():
 
 
 # ── /list_builtin_masters ───────────────────────────────────────────────────
+
+# (expiry, response) — built-in templates change rarely but are hit on every
+# page load, so serve a cached response for up to 60 s between invalidations.
+_builtin_list_cache: tuple | None = None
+
+
 @app.route("/list_builtin_masters", methods=["GET"])
 def list_builtin_masters():
     """
     Return the list of pre-scanned built-in master slides from master_slide/.
     Each entry includes id, name, total_layouts, color_palette, theme_fonts.
     """
+    global _builtin_list_cache
+    now = time.monotonic()
+    if _builtin_list_cache is not None and _builtin_list_cache[0] > now:
+        return _builtin_list_cache[1]
     masters = []
     if not os.path.isdir(BUILTIN_PROFILES_DIR):
         return jsonify({"masters": []})
-    for fname in sorted(os.listdir(BUILTIN_PROFILES_DIR)):
+    pptx_names = set()
+    if os.path.isdir(BUILTIN_MASTER_DIR):
+        with os.scandir(BUILTIN_MASTER_DIR) as it:
+            pptx_names = {e.name for e in it if e.is_file()}
+    with os.scandir(BUILTIN_PROFILES_DIR) as it:
+        profile_entries = sorted(
+            (e for e in it if e.is_file()), key=lambda e: e.name
+        )
+    for entry in profile_entries:
+        fname = entry.name
         if not fname.endswith(".json") or fname.endswith(".profile.json") or fname.endswith(".structure.json"):
             continue
-        fpath = os.path.join(BUILTIN_PROFILES_DIR, fname)
         try:
-            with open(fpath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            pptx_exists = os.path.isfile(
-                os.path.join(BUILTIN_MASTER_DIR, data.get("pptx", ""))
-            )
+            data = _load_json_cached(entry.path)
+            pptx_exists = data.get("pptx", "") in pptx_names
             masters.append({
                 "id":            data.get("id"),
                 "name":          data.get("name"),
@@ -124,7 +286,9 @@ def list_builtin_masters():
             })
         except Exception:
             continue
-    return jsonify({"masters": masters})
+    resp = _json_response({"masters": masters})
+    _builtin_list_cache = (now + 60, resp)
+    return resp
 
 
 # ── /builtin_schema/<id> ────────────────────────────────────────────────────
@@ -134,13 +298,12 @@ def builtin_schema(master_id):
     Return the full layout schema (layouts + theme info) for a built-in master.
     Used by the frontend when building the AI prompt.
     """
-    safe_id = secure_filename(master_id)
+    safe_id = _secure_name(master_id)
     fpath = os.path.join(BUILTIN_PROFILES_DIR, f"{safe_id}.json")
-    if not os.path.isfile(fpath):
+    try:
+        return _conditional_json_file(fpath, _load_json_cached(fpath))
+    except FileNotFoundError:
         return jsonify({"error": f"No built-in profile found for '{master_id}'."}), 404
-    with open(fpath, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return jsonify(data)
 
 
 # ── /list_masters ──────────────────────────────────────────────────────────────
@@ -148,26 +311,25 @@ def builtin_schema(master_id):
 def list_masters():
     """Return all saved master schema records (newest first)."""
     records = []
-    for fname in os.listdir(app.config["UPLOAD_FOLDER"]):
-        if not fname.endswith(".schema.json"):
+    with os.scandir(UPLOAD_FOLDER) as it:
+        entries = [e for e in it if e.is_file()]
+    upload_names = {e.name for e in entries}
+    for entry in entries:
+        if not entry.name.endswith(".schema.json"):
             continue
-        fpath = os.path.join(app.config["UPLOAD_FOLDER"], fname)
         try:
-            with open(fpath, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = _load_json_cached(entry.path)
             pptx_file = data.get("filename", "")
             records.append({
                 "filename":      pptx_file,
                 "saved_at":      data.get("saved_at", ""),
                 "total_layouts": len(data.get("layouts", [])),
-                "pptx_exists":   os.path.isfile(
-                    os.path.join(app.config["UPLOAD_FOLDER"], pptx_file)
-                ),
+                "pptx_exists":   pptx_file in upload_names,
             })
         except Exception:
             continue
     records.sort(key=lambda r: r["saved_at"], reverse=True)
-    return jsonify({"masters": records})
+    return _json_response({"masters": records})
 
 
 # ── /schema/<filename> ──────────────────────────────────────────────────────────────
@@ -175,10 +337,10 @@ def list_masters():
 def get_schema(filename):
     """Return the saved layout schema for a master PPTX."""
     fpath = _schema_json_path(filename)
-    if not os.path.isfile(fpath):
+    try:
+        return _conditional_json_file(fpath)
+    except FileNotFoundError:
         return jsonify({"error": f"No schema found for '{filename}'."}), 404
-    with open(fpath, "r", encoding="utf-8") as f:
-        return jsonify(json.load(f))
 
 
 # ── /update_schema/<filename> ─────────────────────────────────────────────────
@@ -189,15 +351,17 @@ def update_schema(filename):
     if not body or "layouts" not in body:
         return jsonify({"error": "Request must contain a 'layouts' array."}), 400
     fpath = _schema_json_path(filename)
-    if not os.path.isfile(fpath):
+    try:
+        existing = _read_json(fpath)
+    except FileNotFoundError:
         return jsonify({"error": f"No schema found for '{filename}'."}), 404
-    with open(fpath, "r", encoding="utf-8") as f:
-        existing = json.load(f)
+    if body["layouts"] == existing.get("layouts"):
+        # No-op update (frontends re-save on tab switch) — skip the rewrite
+        return _json_response(existing)
     existing["layouts"] = body["layouts"]
-    existing["saved_at"] = datetime.datetime.now().isoformat(timespec="seconds")
-    with open(fpath, "w", encoding="utf-8") as f:
-        json.dump(existing, f, ensure_ascii=False, indent=2)
-    return jsonify(existing)
+    existing["saved_at"] = _now_iso()
+    _write_json(fpath, existing)
+    return _json_response(existing)
 
 
 @app.route("/upload_master", methods=["POST"])
@@ -215,16 +379,33 @@ def upload_master():
     if not allowed_file(file.filename):
         return jsonify({"error": "Only .pptx files are supported."}), 415
 
-    filename = secure_filename(file.filename)
-    save_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-    file.save(save_path)
+    # Reject non-ZIP payloads before touching the disk
+    magic = file.stream.read(4)
+    file.stream.seek(0)
+    if magic != b"PK\x03\x04":
+        return jsonify({"error": "File is not a valid .pptx (bad ZIP signature)."}), 415
+
+    filename = _secure_name(file.filename)
+    save_path = os.path.join(UPLOAD_FOLDER, filename)
+    # Copy with a 1 MB buffer instead of file.save()'s 16 KB chunks —
+    # far fewer write() syscalls for uploads up to the 50 MB limit.
+    with open(save_path, "wb") as dst:
+        shutil.copyfileobj(file.stream, dst, length=1024 * 1024)
+
+    # Cheap structural check: a PPTX package must carry presentation.xml
+    try:
+        with zipfile.ZipFile(save_path) as zf:
+            if "ppt/presentation.xml" not in zf.namelist():
+                raise ValueError("not a PowerPoint package")
+    except Exception:
+        os.remove(save_path)
+        return jsonify({"error": "File is not a valid PowerPoint package."}), 415
 
     # Return existing schema sidecar if available
-    schema_path = _schema_json_path(filename)
+    schema_path = _schema_path_for_stem(os.path.splitext(filename)[0])
     if os.path.isfile(schema_path):
         try:
-            with open(schema_path, "r", encoding="utf-8") as f:
-                schema = json.load(f)
+            schema = _load_json_cached(schema_path)
             return jsonify({
                 "filename":      filename,
                 "schema_source": schema.get("schema_source", "imported"),
@@ -252,8 +433,7 @@ def get_prompt_template():
     """
     if os.path.isfile(AI_PROMPTS_PATH):
         try:
-            with open(AI_PROMPTS_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = _read_json(AI_PROMPTS_PATH)
             if "analyzer_prompt" in data:
                 return jsonify({"template": data["analyzer_prompt"], "saved_at": data.get("saved_at")})
         except Exception:
@@ -274,14 +454,12 @@ def save_prompt_template():
     existing = {}
     if os.path.isfile(AI_PROMPTS_PATH):
         try:
-            with open(AI_PROMPTS_PATH, "r", encoding="utf-8") as f:
-                existing = json.load(f)
+            existing = _read_json(AI_PROMPTS_PATH)
         except Exception:
             pass
     existing["analyzer_prompt"] = body["template"]
-    existing["saved_at"] = datetime.datetime.now().isoformat(timespec="seconds")
-    with open(AI_PROMPTS_PATH, "w", encoding="utf-8") as f:
-        json.dump(existing, f, ensure_ascii=False, indent=2)
+    existing["saved_at"] = _now_iso()
+    _write_json(AI_PROMPTS_PATH, existing)
     return jsonify({"ok": True, "saved_at": existing["saved_at"]})
 
 
@@ -291,8 +469,7 @@ def get_ai_prompts():
     """Return saved AI prompt templates (topic, outline, analyzer) or defaults."""
     if os.path.isfile(AI_PROMPTS_PATH):
         try:
-            with open(AI_PROMPTS_PATH, "r", encoding="utf-8") as f:
-                return jsonify(json.load(f))
+            return _json_response(_read_json(AI_PROMPTS_PATH))
         except Exception:
             pass
     return jsonify({"topic_prompt": "", "outline_prompt": "", "analyzer_prompt": "", "saved_at": None})
@@ -308,8 +485,7 @@ def save_ai_prompts():
     existing = {}
     if os.path.isfile(AI_PROMPTS_PATH):
         try:
-            with open(AI_PROMPTS_PATH, "r", encoding="utf-8") as f:
-                existing = json.load(f)
+            existing = _read_json(AI_PROMPTS_PATH)
         except Exception:
             pass
     if "topic_prompt" in body:
@@ -318,9 +494,8 @@ def save_ai_prompts():
         existing["outline_prompt"] = body["outline_prompt"]
     if "analyzer_prompt" in body:
         existing["analyzer_prompt"] = body["analyzer_prompt"]
-    existing["saved_at"] = datetime.datetime.now().isoformat(timespec="seconds")
-    with open(AI_PROMPTS_PATH, "w", encoding="utf-8") as f:
-        json.dump(existing, f, ensure_ascii=False, indent=2)
+    existing["saved_at"] = _now_iso()
+    _write_json(AI_PROMPTS_PATH, existing)
     return jsonify({"ok": True, "saved_at": existing["saved_at"]})
 
 
@@ -341,11 +516,11 @@ def import_schema():
     if not body:
         return jsonify({"error": "Request body must be JSON."}), 400
 
-    filename = secure_filename(body.get("filename", ""))
+    filename = _secure_name(body.get("filename", ""))
     if not filename:
         return jsonify({"error": "'filename' is required."}), 400
 
-    pptx_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+    pptx_path = os.path.join(UPLOAD_FOLDER, filename)
     if not os.path.isfile(pptx_path):
         return jsonify({"error": f"File '{filename}' not found. Upload it first."}), 404
 
@@ -356,16 +531,67 @@ def import_schema():
     # Save AI schema as-is, only stamping metadata
     saved = dict(ai_schema)
     saved["filename"]      = filename
-    saved["saved_at"]      = datetime.datetime.now().isoformat(timespec="seconds")
+    saved["saved_at"]      = _now_iso()
     saved["schema_source"] = "manual"
 
-    schema_path = _schema_json_path(filename)
-    with open(schema_path, "w", encoding="utf-8") as f:
-        json.dump(saved, f, ensure_ascii=False, indent=2)
+    schema_path = _schema_path_for_stem(os.path.splitext(filename)[0])
+    _write_json(schema_path, saved)
 
     return jsonify(saved)
 
 
+# date / footer / slide-number placeholders, excluded from the inventory
+_SKIP_PH_IDXS = frozenset({10, 11, 12})
+
+# multiply instead of dividing by 914400 EMU/inch in the placeholder loop
+_EMU_TO_IN = 1.0 / 914400
+
+# one format template per layout block — a single str.format call instead of
+# rebuilding the framing characters in several f-strings per layout
+_LAYOUT_BLOCK = (
+    "  ┌─ layout_index={gi}  master_index={mi}  local_layout_index={li}\n"
+    '  │  name: "{name}"  xml_type: {xml_type}\n'
+    "  │  background: {bg_note}\n"
+    "  │  text_density: {density}  (brightness={br_str}/255)\n"
+    "  │  content_placeholders ({nph}):\n"
+    "{ph_block}"
+    "  └─────────────────────────────────────────────────────────"
+)
+
+# sorted threshold → label tables for _visual_desc, indexed via bisect
+_LUM_THRESHOLDS = (60, 120, 170, 220)
+_LUM_LABELS     = ("very dark", "dark", "medium", "light", "very light")
+_HUE_THRESHOLDS = (30, 75, 165, 255, 290)
+_HUE_LABELS     = ("red", "yellow/orange", "green", "blue", "purple", "pink")
+
+# Pure labelling helpers for the inventory text.  Brightness values and
+# rounded placeholder rectangles repeat heavily across layouts, so both
+# are memoized.
+@functools.lru_cache(maxsize=1024)
+def _density_label(br):
+    """Return (density_str, br_str) from a brightness int or None."""
+    if br is None:  return "normal",       "N/A"
+    if br < 80:     return "title_only",   str(br)
+    if br < 160:    return "minimal_text",  str(br)
+    return "normal", str(br)
+
+
+@functools.lru_cache(maxsize=1024)
+def _pos_label(l, t, w, h):
+    """Translate placeholder position (inches) to a readable layout label."""
+    parts = []
+    parts.append("header" if t < 1.5 else "footer" if t > 4.5 else "body")
+    parts.append(
+        "full-width" if w > 9  else
+        "left-col"   if l < 3  else
+        "right-col"  if l > 5  else
+        "center"
+    )
+    if h < 0.8: parts.append("1-line")
+    elif h > 3: parts.append("large")
+    return "+".join(parts)
+
+
 # ── /export_inventory/<filename> ────────────────────────────────────────────
 @app.route("/export_inventory/<path:filename>", methods=["GET"])
 def export_inventory(filename):
@@ -376,19 +602,16 @@ def export_inventory(filename):
     layouts that share the same name but belong to visually different masters.
     User pastes this text into the AI schema-generation prompt.
     """
-    safe_name = secure_filename(filename)
-    pptx_path = os.path.join(app.config["UPLOAD_FOLDER"], safe_name)
-    if not os.path.isfile(pptx_path):
-        return jsonify({"error": f"File '{filename}' not found."}), 404
+    safe_name = _secure_name(filename)
+    pptx_path = os.path.join(UPLOAD_FOLDER, safe_name)
 
     try:
         import io as _io
         import colorsys
         from pptx.enum.shapes import MSO_SHAPE_TYPE
-        from PIL import Image
-        from lxml import etree as _etree
+        from PIL import Image, ImageStat
 
-        prs = Presentation(pptx_path)
+        prs = _open_master(pptx_path)
         W = prs.slide_width
         H = prs.slide_height
 
@@ -415,15 +638,13 @@ def export_inventory(filename):
                         (shape.height or 0) / H > 1 - tol
                     ):
                         continue
-                    img = (
-                        Image.open(_io.BytesIO(shape.image.blob))
-                        .convert("RGB")
-                        .resize((80, 45))
+                    img = Image.open(_io.BytesIO(shape.image.blob))
+                    # JPEGs decode straight to a small approximation;
+                    # no-op for other formats
+                    img.draft("RGB", (32, 18))
+                    r, g, b = (
+                        int(v) for v in ImageStat.Stat(img.convert("RGB")).mean
                     )
-                    pixels = list(img.getdata())
-                    r = sum(p[0] for p in pixels) // len(pixels)
-                    g = sum(p[1] for p in pixels) // len(pixels)
-                    b = sum(p[2] for p in pixels) // len(pixels)
                     br = round((r * 299 + g * 587 + b * 114) / 1000)
                     return f"#{r:02X}{g:02X}{b:02X}", br
                 except Exception:
@@ -437,16 +658,17 @@ def export_inventory(filename):
             """
             try:
                 for rel in master.part.rels.values():
-                    if "theme" in rel.reltype:
-                        theme_el = _etree.fromstring(rel.target_part.blob)
-                        cs = theme_el.find(".//" + qn("a:clrScheme"))
-                        if cs is None:
+                    if rel.reltype == RT.THEME:
+                        theme_el = etree.fromstring(rel.target_part.blob, _THEME_PARSER)
+                        found = _CLRSCHEME_XP(theme_el)
+                        if not found:
                             return {}
+                        cs = found[0]
                         clrs = {}
                         for child in cs:
                             tag = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-                            srgb  = child.find(qn("a:srgbClr"))
-                            sys_c = child.find(qn("a:sysClr"))
+                            srgb  = child.find(_QN_SRGBCLR)
+                            sys_c = child.find(_QN_SYSCLR)
                             if srgb is not None:
                                 clrs[tag] = f"#{srgb.get('val', '').upper()}"
                             elif sys_c is not None:
@@ -481,21 +703,11 @@ def export_inventory(filename):
                 h, s, v = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
                 h_deg = round(h * 360)
                 s_pct = round(s * 100)
-                lum = (
-                    "very dark"  if br < 60  else
-                    "dark"       if br < 120 else
-                    "medium"     if br < 170 else
-                    "light"      if br < 220 else
-                    "very light"
-                )
+                lum = _LUM_LABELS[bisect.bisect_right(_LUM_THRESHOLDS, br)]
                 hue = (
-                    "neutral"        if s_pct < 12 else
-                    "red"            if h_deg < 30  else
-                    "yellow/orange"  if h_deg < 75  else
-                    "green"          if h_deg < 165 else
-                    "blue"           if h_deg < 255 else
-                    "purple"         if h_deg < 290 else
-                    "pink"
+                    "neutral"
+                    if s_pct < 12
+                    else _HUE_LABELS[bisect.bisect_right(_HUE_THRESHOLDS, h_deg)]
                 )
                 rec     = "white text" if br < 140 else "dark text"
                 accent1 = theme.get("accent1", "?")
@@ -503,27 +715,6 @@ def export_inventory(filename):
             except Exception:
                 return f"brightness={br}/255"
 
-        def _density_label(br):
-            """Return (density_str, br_str) from a brightness int or None."""
-            if br is None:  return "normal",       "N/A"
-            if br < 80:     return "title_only",   str(br)
-            if br < 160:    return "minimal_text",  str(br)
-            return "normal", str(br)
-
-        def _pos_label(l, t, w, h):
-            """Translate placeholder position (inches) to a readable layout label."""
-            parts = []
-            parts.append("header" if t < 1.5 else "footer" if t > 4.5 else "body")
-            parts.append(
-                "full-width" if w > 9  else
-                "left-col"   if l < 3  else
-                "right-col"  if l > 5  else
-                "center"
-            )
-            if h < 0.8: parts.append("1-line")
-            elif h > 3: parts.append("large")
-            return "+".join(parts)
-
         # ── build inventory text ──────────────────────────────────────────────
 
         stem          = os.path.splitext(safe_name)[0]
@@ -536,7 +727,7 @@ def export_inventory(filename):
             "# per-placeholder description/content_hint/max_words, and example.",
             "",
             f"file: {stem}",
-            f"canvas: {round(W / 914400, 2)}\" x {round(H / 914400, 2)}\"",
+            f"canvas: {round(W * _EMU_TO_IN, 2)}\" x {round(H * _EMU_TO_IN, 2)}\"",
             f"total_masters: {len(prs.slide_masters)}",
             f"total_layouts: {total_layouts}",
             "",
@@ -582,53 +773,57 @@ def export_inventory(filename):
                 content_phs = []
                 for ph in layout.placeholders:
                     idx = ph.placeholder_format.idx
-                    if idx in (10, 11, 12):
+                    if idx in _SKIP_PH_IDXS:
                         continue
                     tn = (
                         ph.placeholder_format.type.name
                         if ph.placeholder_format.type
                         else "UNKNOWN"
                     )
-                    l = round((ph.left   or 0) / 914400, 2)
-                    t = round((ph.top    or 0) / 914400, 2)
-                    w = round((ph.width  or 0) / 914400, 2)
-                    h = round((ph.height or 0) / 914400, 2)
+                    l = round((ph.left   or 0) * _EMU_TO_IN, 2)
+                    t = round((ph.top    or 0) * _EMU_TO_IN, 2)
+                    w = round((ph.width  or 0) * _EMU_TO_IN, 2)
+                    h = round((ph.height or 0) * _EMU_TO_IN, 2)
                     content_phs.append(
                         f"    idx={idx} {tn} "
                         f"left={l}\" top={t}\" w={w}\" h={h}\" "
                         f"[{_pos_label(l, t, w, h)}]"
                     )
 
-                lines += [
-                    f"  ┌─ layout_index={global_idx}"
-                    f"  master_index={mi}"
-                    f"  local_layout_index={li}",
-                    f"  │  name: \"{layout.name}\"  xml_type: {xml_type}",
-                    f"  │  background: {bg_note}",
-                    f"  │  text_density: {density}  (brightness={br_str}/255)",
-                    f"  │  content_placeholders ({len(content_phs)}):",
-                ]
-                for p in (content_phs or ["    (none)"]): lines.append(f"  │{p}")
-                lines += [
-                    f"  └─────────────────────────────────────────────────────────",
-                    "",
-                ]
+                ph_block = (
+                    "".join(f"  │{p}\n" for p in content_phs)
+                    or "  │    (none)\n"
+                )
+                lines.append(_LAYOUT_BLOCK.format(
+                    gi=global_idx, mi=mi, li=li,
+                    name=layout.name, xml_type=xml_type,
+                    bg_note=bg_note, density=density, br_str=br_str,
+                    nph=len(content_phs), ph_block=ph_block,
+                ))
+                lines.append("")
                 global_idx += 1
 
-        text = "\n".join(lines)
-        buf  = _io.BytesIO(text.encode("utf-8"))
-        buf.seek(0)
-        return send_file(
-            buf,
-            as_attachment=True,
-            download_name=f"{stem}_layout_inventory.txt",
-            mimetype="text/plain",
+        resp = app.response_class("\n".join(lines), mimetype="text/plain")
+        resp.headers["Content-Disposition"] = (
+            f'attachment; filename="{stem}_layout_inventory.txt"'
         )
+        return resp
+    except OSError:
+        # Missing file, or a name that sanitizes to "" and points at the
+        # uploads directory itself — both were 404s before the EAFP rewrite.
+        return jsonify({"error": f"File '{filename}' not found."}), 404
     except Exception as exc:
         return jsonify({"error": str(exc)}), 500
 
 
 # ── /export_layout_previews/<filename> ───────────────────────────────────────
+
+# preview-label geometry and styling, identical for every slide and request
+_LABEL_BOX       = (Inches(0.1), Inches(0.05), Inches(8), Inches(0.35))
+_LABEL_FONT_SIZE = Pt(10)
+_LABEL_COLOR     = RGBColor(0xFF, 0x00, 0x00)
+
+
 @app.route("/export_layout_previews/<path:filename>", methods=["GET"])
 def export_layout_previews(filename):
     """
@@ -637,30 +832,24 @@ def export_layout_previews(filename):
     The user can open it in PowerPoint/Google Slides and screenshot layouts
     to send to an AI for manual schema generation.
     """
-    from pptx.util import Inches, Pt
-    from pptx.dml.color import RGBColor
-
-    safe_name = secure_filename(filename)
-    pptx_path = os.path.join(app.config["UPLOAD_FOLDER"], safe_name)
-    if not os.path.isfile(pptx_path):
-        return jsonify({"error": f"File '{filename}' not found."}), 404
+    safe_name = _secure_name(filename)
+    pptx_path = os.path.join(UPLOAD_FOLDER, safe_name)
+    schema_path = _schema_path_for_stem(os.path.splitext(safe_name)[0])
+    try:
+        schema = _load_json_cached(schema_path)
+    except FileNotFoundError:
+        return jsonify({"error": f"No schema found for '{filename}'. Import a schema first."}), 404
 
     try:
-        schema_path = _schema_json_path(safe_name)
-        if not os.path.isfile(schema_path):
-            return jsonify({"error": f"No schema found for '{filename}'. Import a schema first."}), 404
-        with open(schema_path, "r", encoding="utf-8") as f:
-            schema = json.load(f)
-        preview_prs = Presentation(pptx_path)
+        preview_prs = _open_master(pptx_path)
+        resolve_layout = _layout_lookup(preview_prs, schema["layouts"])
 
         for lo in schema["layouts"]:
-            layout = _resolve_layout_from_schema(preview_prs, schema["layouts"], lo["layout_index"])
+            layout = resolve_layout(lo["layout_index"])
             slide = preview_prs.slides.add_slide(layout)
 
             # Red label: layout_index + name + text_density
-            box = slide.shapes.add_textbox(
-                Inches(0.1), Inches(0.05), Inches(8), Inches(0.35)
-            )
+            box = slide.shapes.add_textbox(*_LABEL_BOX)
             tf = box.text_frame
             density = lo.get("text_density", "?")
             tf.text = (
@@ -669,11 +858,11 @@ def export_layout_previews(filename):
                 f"  |  usable={lo.get('usable', '?')}"
             )
             run = tf.paragraphs[0].runs[0]
-            run.font.size = Pt(10)
+            run.font.size = _LABEL_FONT_SIZE
             run.font.bold = True
-            run.font.color.rgb = RGBColor(0xFF, 0x00, 0x00)
+            run.font.color.rgb = _LABEL_COLOR
 
-        buf = io.BytesIO()
+        buf = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
         preview_prs.save(buf)
         buf.seek(0)
 
@@ -682,12 +871,42 @@ def export_layout_previews(filename):
             buf,
             as_attachment=True,
             download_name=f"{stem}_layout_previews.pptx",
-            mimetype="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+            mimetype=PPTX_MIME,
         )
+    except OSError:
+        # covers names that sanitize to "" and resolve to the directory
+        return jsonify({"error": f"File '{filename}' not found."}), 404
     except Exception as exc:
         return jsonify({"error": str(exc)}), 500
 
 
+@functools.lru_cache(maxsize=64)
+def _layouts_block(schema_path: str, mtime_ns: int) -> str:
+    """Rendered layout reference block for schema_prompt.
+
+    Keyed by (path, mtime) so repeated prompt requests with different topics
+    reuse the same rendered block until the schema changes.  Tokens stream
+    into one buffer instead of materializing per-layout strings.
+    """
+    schema = _load_json_cached(schema_path)
+    out = io.StringIO()
+    write = out.write
+    for i, lo in enumerate(schema.get("layouts", [])):
+        if i:
+            write("\n\n")
+        write(f"  layout_index={lo['layout_index']} | {lo['layout_name']}\n")
+        write(f"    use_for: {lo.get('use_for', '')}\n")
+        write(f"    text_density: {lo.get('text_density', 'normal')}\n")
+        write(f"    guidance: {lo.get('content_guidance', 'Fill placeholders appropriately.')}\n")
+        write("    placeholders: [")
+        for j, p in enumerate(lo.get("placeholders", [])):
+            if j:
+                write(", ")
+            write(f"idx={p['idx']}({p['type']}): {p.get('content_hint', p.get('description', ''))}")
+        write("]")
+    return out.getvalue()
+
+
 # ── /schema_prompt/<filename> ─────────────────────────────────────────────────
 @app.route("/schema_prompt/<path:filename>", methods=["GET"])
 def schema_prompt(filename):
@@ -699,36 +918,19 @@ def schema_prompt(filename):
       slides:   number of slides (default 10)
       language: output language (default "Japanese")
     """
-    safe_name = secure_filename(filename)
-    fpath = _schema_json_path(safe_name)
-    if not os.path.isfile(fpath):
+    safe_name = _secure_name(filename)
+    fpath = _schema_path_for_stem(os.path.splitext(safe_name)[0])
+    try:
+        layouts_block = _layouts_block(fpath, os.stat(fpath).st_mtime_ns)
+        # cache hit — _layouts_block just loaded the same file
+        schema_source = _load_json_cached(fpath).get("schema_source", "auto")
+    except FileNotFoundError:
         return jsonify({"error": f"No schema found for '{filename}'."}), 404
 
-    with open(fpath, "r", encoding="utf-8") as f:
-        schema = json.load(f)
-
     topic    = request.args.get("topic", "")
     n_slides = request.args.get("slides", "10")
     language = request.args.get("language", "Japanese")
 
-    # Build layout reference block
-    layout_lines = []
-    for lo in schema.get("layouts", []):
-        phs = ", ".join(
-            f"idx={p['idx']}({p['type']}): {p.get('content_hint', p.get('description', ''))}"
-            for p in lo.get("placeholders", [])
-        )
-        line = (
-            f"  layout_index={lo['layout_index']} | {lo['layout_name']}\n"
-            f"    use_for: {lo.get('use_for', '')}\n"
-            f"    text_density: {lo.get('text_density', 'normal')}\n"
-            f"    guidance: {lo.get('content_guidance', 'Fill placeholders appropriately.')}\n"
-            f"    placeholders: [{phs}]"
-        )
-        layout_lines.append(line)
-
-    layouts_block = "\n\n".join(layout_lines)
-
     prompt = f"""You are generating a PowerPoint presentation outline.
 
 TOPIC: {topic if topic else '<user will specify>'}
@@ -768,7 +970,7 @@ For minimal_text layouts: placeholders array has at most 1 item with max 3 bulle
 
 Generate the presentation outline now."""
 
-    return jsonify({"prompt": prompt, "schema_source": schema.get("schema_source", "auto")})
+    return jsonify({"prompt": prompt, "schema_source": schema_source})
 
 
 # ── /save_as_builtin ─────────────────────────────────────────────────────
@@ -789,11 +991,11 @@ def save_as_builtin():
     if not body:
         return jsonify({"error": "Request body must be JSON."}), 400
 
-    filename = secure_filename(body.get("filename", ""))
+    filename = _secure_name(body.get("filename", ""))
     if not filename:
         return jsonify({"error": "'filename' is required."}), 400
 
-    src_pptx = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+    src_pptx = os.path.join(UPLOAD_FOLDER, filename)
     if not os.path.isfile(src_pptx):
         return jsonify({"error": f"File '{filename}' not found in uploads/."}), 404
 
@@ -801,18 +1003,17 @@ def save_as_builtin():
     raw_id = (body.get("builtin_id") or "").strip()
     if not raw_id:
         stem = os.path.splitext(filename)[0]
-        raw_id = re.sub(r"[^a-zA-Z0-9_-]", "-", stem).lower()
-    builtin_id   = secure_filename(raw_id)
+        raw_id = _SLUG_RE.sub("-", stem).lower()
+    builtin_id   = _secure_name(raw_id)
     builtin_name = (body.get("builtin_name") or builtin_id).strip() or builtin_id
 
     # Get schema (from body or from saved .schema.json)
     schema = body.get("schema")
     if not schema:
-        schema_path = _schema_json_path(filename)
+        schema_path = _schema_path_for_stem(os.path.splitext(filename)[0])
         if not os.path.isfile(schema_path):
             return jsonify({"error": "No schema found. Run a scan or import first."}), 400
-        with open(schema_path, "r", encoding="utf-8") as f:
-            schema = json.load(f)
+        schema = _read_json(schema_path)
 
     # Ensure target directories exist
     os.makedirs(BUILTIN_MASTER_DIR, exist_ok=True)
@@ -834,12 +1035,14 @@ def save_as_builtin():
         "color_palette": {},
         "layouts":       schema.get("layouts", []),
         "schema_source": schema.get("schema_source", "auto"),
-        "saved_at":      datetime.datetime.now().isoformat(timespec="seconds"),
+        "saved_at":      _now_iso(),
     }
 
     profile_path = os.path.join(BUILTIN_PROFILES_DIR, f"{builtin_id}.json")
-    with open(profile_path, "w", encoding="utf-8") as f:
-        json.dump(profile, f, ensure_ascii=False, indent=2)
+    _write_json(profile_path, profile)
+
+    global _builtin_list_cache
+    _builtin_list_cache = None
 
     return jsonify({
         "ok":          True,
@@ -854,42 +1057,62 @@ def save_as_builtin():
 @app.route("/delete_builtin/<path:builtin_id>", methods=["DELETE"])
 def delete_builtin(builtin_id):
     """Delete a built-in template: removes the JSON profile and its PPTX from master_slide/."""
-    safe_id = secure_filename(builtin_id)
+    safe_id = _secure_name(builtin_id)
     profile_path = os.path.join(BUILTIN_PROFILES_DIR, f"{safe_id}.json")
     if not os.path.isfile(profile_path):
         return jsonify({"error": f"Template '{builtin_id}' not found."}), 404
 
-    with open(profile_path, "r", encoding="utf-8") as f:
-        profile = json.load(f)
+    profile = _read_json(profile_path)
 
     os.remove(profile_path)
 
     pptx_fname = profile.get("pptx", "")
     if pptx_fname:
-        pptx_path = os.path.join(BUILTIN_MASTER_DIR, secure_filename(pptx_fname))
+        pptx_path = os.path.join(BUILTIN_MASTER_DIR, _secure_name(pptx_fname))
         if os.path.isfile(pptx_path):
             os.remove(pptx_path)
 
+    global _builtin_list_cache
+    _builtin_list_cache = None
+
     return jsonify({"ok": True, "deleted_id": safe_id})
 
 
 # ── XML-safe placeholder helpers ─────────────────────────────────────────────
+
+# qn() lookups hoisted out of the per-paragraph hot path
+_A_NS          = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_QN_P          = qn("a:p")
+_QN_PPR        = qn("a:pPr")
+_QN_R          = qn("a:r")
+_QN_T          = qn("a:t")
+_QN_ENDPARARPR = qn("a:endParaRPr")
+
+# theme XML handling for export_inventory: one shared parser (no ID
+# collection, no entity resolution) and a precompiled clrScheme lookup
+_THEME_PARSER = etree.XMLParser(collect_ids=False, resolve_entities=False)
+_CLRSCHEME_XP = etree.XPath(".//a:clrScheme", namespaces={"a": _A_NS})
+_QN_SRGBCLR   = qn("a:srgbClr")
+_QN_SYSCLR    = qn("a:sysClr")
+
+
 def _set_placeholder_text(placeholder, text: str) -> None:
     """Fill text into a placeholder WITHOUT touching font/color/size.
     Preserves <a:pPr> and <a:endParaRPr> so Slide Master cascade stays intact."""
     txBody = placeholder.text_frame._txBody
-    paras = txBody.findall(qn("a:p"))
+    paras = txBody.findall(_QN_P)
     first_p = paras[0]
-    for p in paras[1:]:
-        txBody.remove(p)
-    pPr = first_p.find(qn("a:pPr"))
-    endParaRPr = first_p.find(qn("a:endParaRPr"))
-    for child in list(first_p):
-        first_p.remove(child)
+    if len(paras) > 1:
+        # paragraphs are the trailing children of txBody, so one slice
+        # delete drops them all in a single C-level call
+        del txBody[txBody.index(first_p) + 1:]
+    pPr = first_p.find(_QN_PPR)
+    endParaRPr = first_p.find(_QN_ENDPARARPR)
+    del first_p[:]
     if pPr is not None:
         first_p.insert(0, pPr)
-    r = etree.SubElement(first_p, qn("a:r"))
-    t = etree.SubElement(r, qn("a:t"))
+    r = etree.SubElement(first_p, _QN_R)
+    t = etree.SubElement(r, _QN_T)
     t.text = str(text)
     if endParaRPr is not None:
         first_p.append(endParaRPr)
@@ -897,60 +1120,81 @@ def _set_placeholder_text(placeholder, text: str) -> None:
 
 def _set_placeholder_list(placeholder, items: list) -> None:
     """Fill a bullet list into a placeholder WITHOUT touching font/color/size.
-    Clones the first paragraph's <a:pPr> for each bullet to preserve indent/bullet style."""
+    Reuses the first paragraph's <a:pPr>/<a:endParaRPr> for every bullet to
+    preserve indent/bullet style from the Slide Master cascade."""
     txBody = placeholder.text_frame._txBody
-    existing = txBody.findall(qn("a:p"))
+    existing = txBody.findall(_QN_P)
     first_p = existing[0]
-    for p in existing[1:]:
-        txBody.remove(p)
-    for i, item in enumerate(items):
-        if i == 0:
-            p = first_p
-        else:
-            p = copy.deepcopy(first_p)
-            txBody.append(p)
-        pPr = p.find(qn("a:pPr"))
-        endParaRPr = p.find(qn("a:endParaRPr"))
-        for child in list(p):
-            p.remove(child)
-        if pPr is not None:
-            p.insert(0, pPr)
-        r = etree.SubElement(p, qn("a:r"))
-        t = etree.SubElement(r, qn("a:t"))
-        t.text = str(item)
-        if endParaRPr is not None:
-            p.append(endParaRPr)
+    if len(existing) > 1:
+        del txBody[txBody.index(first_p) + 1:]
+    if not items:
+        return
+    pPr = first_p.find(_QN_PPR)
+    endParaRPr = first_p.find(_QN_ENDPARARPR)
+    # Serialize the style elements once and parse a ready-made paragraph per
+    # bullet — lxml's C parser beats deepcopy + per-node SubElement work.
+    pPr_xml = etree.tostring(pPr, encoding="unicode") if pPr is not None else ""
+    end_xml = etree.tostring(endParaRPr, encoding="unicode") if endParaRPr is not None else ""
+    prefix = f'<a:p xmlns:a="{_A_NS}">{pPr_xml}<a:r><a:t>'
+    suffix = f"</a:t></a:r>{end_xml}</a:p>"
+    txBody.remove(first_p)
+    for item in items:
+        txBody.append(etree.fromstring(prefix + xml_escape(str(item)) + suffix))
+
+
+# Master templates are reused across many /generate requests, so keep their
+# bytes in memory — bounded, since uploads come and go: a stale mtime key
+# simply ages out of the LRU once its master stops being requested.
+@functools.lru_cache(maxsize=32)
+def _master_bytes(path: str, mtime_ns: int) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _open_master(path: str) -> Presentation:
+    """Construct a Presentation for *path* from cached package bytes.
+
+    python-pptx objects don't support deepcopy, so the raw bytes are cached
+    instead; repeat generations skip the disk read and parse from memory.
+    """
+    st = os.stat(path)
+    return Presentation(io.BytesIO(_master_bytes(path, st.st_mtime_ns)))
 
 
 # ── Multi-master layout resolver ─────────────────────────────────────────
 
-def _resolve_layout_from_schema(prs, schema_layouts: list, layout_index: int):
-    """
-    Find the correct layout object using master_index + local_layout_index
-    stored in the schema entry.  Falls back to a global linear count if the
-    schema entry is missing those fields.
+def _layout_lookup(prs, schema_layouts: list):
+    """Build an O(1) layout_index → layout resolver for one presentation.
+
+    Resolves via master_index + local_layout_index from the schema entry,
+    falling back to the global layout order (matches deep_scan global_index).
+    The entry map and global layout list are precomputed once, so each slide
+    costs a dict/list lookup instead of a linear scan.
     """
-    entry = next((lo for lo in schema_layouts if lo.get("layout_index") == layout_index), None)
-    if entry and "master_index" in entry and "local_layout_index" in entry:
-        mi = entry["master_index"]
-        li = entry["local_layout_index"]
-        try:
-            return prs.slide_masters[mi].slide_layouts[li]
-        except IndexError:
-            pass
-    # Fallback: count globally across all masters (matches deep_scan global_index)
-    count = 0
-    for master in prs.slide_masters:
-        for layout in master.slide_layouts:
-            if count == layout_index:
-                return layout
-            count += 1
-    return prs.slide_masters[0].slide_layouts[0]
+    entry_by_idx = {lo.get("layout_index"): lo for lo in schema_layouts}
+    global_layouts = [
+        layout for master in prs.slide_masters for layout in master.slide_layouts
+    ]
+
+    def resolve(layout_index: int):
+        entry = entry_by_idx.get(layout_index)
+        if entry and "master_index" in entry and "local_layout_index" in entry:
+            try:
+                return prs.slide_masters[entry["master_index"]].slide_layouts[
+                    entry["local_layout_index"]
+                ]
+            except IndexError:
+                pass
+        if 0 <= layout_index < len(global_layouts):
+            return global_layouts[layout_index]
+        return global_layouts[0]
+
+    return resolve
 
 
 # ── Profile-based PPTX builder ────────────────────────────────────────────
 
-def create_pptx_from_profile(json_data: dict, schema_layouts: list | None = None) -> io.BytesIO:
+def create_pptx_from_profile(json_data: dict, schema_layouts: list | None = None):
     """
     Build a PPTX using master_slide.pptx as the seed template.
     All formatting (fonts, colors, backgrounds) is inherited automatically
@@ -963,43 +1207,45 @@ def create_pptx_from_profile(json_data: dict, schema_layouts: list | None = None
         )
 
     _schema = schema_layouts or []
-    prs = Presentation(MASTER_SLIDE_PATH)
+    prs = _open_master(MASTER_SLIDE_PATH)
+    resolve_layout = _layout_lookup(prs, _schema)
 
     for slide_data in json_data.get("slides", []):
         layout_index = int(slide_data.get("layout_index", 0))
-        layout = _resolve_layout_from_schema(prs, _schema, layout_index)
+        layout = resolve_layout(layout_index)
         slide = prs.slides.add_slide(layout)
 
-        # Build content map: ph_idx → {content, type}
+        # Build content map: ph_idx → (fill handler, payload), decided once here
         content_map: dict = {}
         if "title" in slide_data:
-            content_map[0] = {"content": slide_data["title"], "type": "text"}
-        for ph in slide_data.get("placeholders", []):
-            idx = int(ph.get("id", ph.get("idx", 0)))
-            content_map[idx] = {
-                "content": ph.get("content", ""),
-                "type":    ph.get("type", "text"),
-            }
-
-        # Fill placeholders — no font/color/size overrides
-        for ph in slide.placeholders:
-            idx = ph.placeholder_format.idx
-            if idx not in content_map:
-                continue
-            info = content_map[idx]
-            if info["type"] == "list" and isinstance(info["content"], list):
-                _set_placeholder_list(ph, info["content"])
+            content_map[0] = (_set_placeholder_text, str(slide_data["title"]))
+        for ph_data in slide_data.get("placeholders", []):
+            idx = int(ph_data.get("id", ph_data.get("idx", 0)))
+            content = ph_data.get("content", "")
+            if ph_data.get("type", "text") == "list" and isinstance(content, list):
+                content_map[idx] = (_set_placeholder_list, content)
             else:
-                _set_placeholder_text(ph, str(info["content"]))
+                content_map[idx] = (_set_placeholder_text, str(content))
 
-    buf = io.BytesIO()
+        # Fill placeholders — no font/color/size overrides
+        if not content_map:
+            continue  # title-only slide: skip the placeholder XML walk
+        ph_by_idx = {p.placeholder_format.idx: p for p in slide.placeholders}
+        for idx, (fill, payload) in content_map.items():
+            ph = ph_by_idx.get(idx)
+            if ph is not None:
+                fill(ph, payload)
+
+    # Small decks stay in RAM; anything past 8 MB spills to a temp file so
+    # peak memory stays bounded while send_file streams the result.
+    buf = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
     prs.save(buf)
     buf.seek(0)
     return buf
 
 
 # ── Core generator ────────────────────────────────────────────────────────────
-def create_pptx_from_json(json_data: dict, master_path: str, schema_layouts: list | None = None) -> io.BytesIO:
+def create_pptx_from_json(json_data: dict, master_path: str, schema_layouts: list | None = None):
     """
     Build a new PowerPoint from *json_data* using *master_path* as the seed template.
     All formatting (fonts, colors, backgrounds) is inherited automatically from
@@ -1022,41 +1268,70 @@ def create_pptx_from_json(json_data: dict, master_path: str, schema_layouts: lis
     }
     """
     _schema = schema_layouts or []
-    prs = Presentation(master_path)
+    prs = _open_master(master_path)
+    resolve_layout = _layout_lookup(prs, _schema)
 
     for slide_data in json_data.get("slides", []):
         layout_index = int(slide_data.get("layout_index", 0))
-        layout = _resolve_layout_from_schema(prs, _schema, layout_index)
+        layout = resolve_layout(layout_index)
         slide = prs.slides.add_slide(layout)
 
-        # Build content map: ph_idx → {content, type}
+        # Build content map: ph_idx → (fill handler, payload), decided once here
         content_map: dict = {}
         if "title" in slide_data:
-            content_map[0] = {"content": slide_data["title"], "type": "text"}
+            content_map[0] = (_set_placeholder_text, str(slide_data["title"]))
         for ph_data in slide_data.get("placeholders", []):
             idx = int(ph_data.get("id", ph_data.get("idx", 0)))
-            content_map[idx] = {
-                "content": ph_data.get("content", ""),
-                "type":    ph_data.get("type", "text"),
-            }
-
-        # Fill placeholders — no font/color/size overrides
-        for ph in slide.placeholders:
-            idx = ph.placeholder_format.idx
-            if idx not in content_map:
-                continue
-            info = content_map[idx]
-            if info["type"] == "list" and isinstance(info["content"], list):
-                _set_placeholder_list(ph, info["content"])
+            content = ph_data.get("content", "")
+            if ph_data.get("type", "text") == "list" and isinstance(content, list):
+                content_map[idx] = (_set_placeholder_list, content)
             else:
-                _set_placeholder_text(ph, str(info["content"]))
+                content_map[idx] = (_set_placeholder_text, str(content))
 
-    buf = io.BytesIO()
+        # Fill placeholders — no font/color/size overrides
+        if not content_map:
+            continue  # title-only slide: skip the placeholder XML walk
+        ph_by_idx = {p.placeholder_format.idx: p for p in slide.placeholders}
+        for idx, (fill, payload) in content_map.items():
+            ph = ph_by_idx.get(idx)
+            if ph is not None:
+                fill(ph, payload)
+
+    # Small decks stay in RAM; anything past 8 MB spills to a temp file so
+    # peak memory stays bounded while send_file streams the result.
+    buf = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
     prs.save(buf)
     buf.seek(0)
     return buf
 
 
+def _validate_generate_body(body) -> str | None:
+    """Check the /generate payload shape once, up front.
+
+    Returns an error message for the 400 response, or None when valid.
+    """
+    if not isinstance(body, dict) or not body:
+        return "Request body must be JSON."
+    slides = body.get("slides")
+    if not isinstance(slides, list) or not slides:
+        return "'slides' must be a non-empty array."
+    if not all(isinstance(s, dict) for s in slides):
+        return "Each entry in 'slides' must be an object."
+    return None
+
+
+def _deck_digest(raw: bytes, *paths: str) -> str:
+    """Cache digest for a generated deck: the raw request body plus the mtime
+    of every file the deck is built from.  Same digest ⇒ same output."""
+    h = hashlib.sha1(raw)
+    for p in paths:
+        try:
+            h.update(f"|{p}:{os.stat(p).st_mtime_ns}".encode())
+        except OSError:
+            h.update(f"|{p}:-".encode())
+    return h.hexdigest()
+
+
 # ── /generate route ────────────────────────────────────────────────────────────
 @app.route("/generate", methods=["POST"])
 def generate():
@@ -1074,12 +1349,14 @@ def generate():
     Profile mode (legacy, no master PPTX needed):
         { "mode": "profile", "slides": [...], "presentation_name": "..." }
     """
-    body = request.get_json(silent=True)
-    if not body:
-        return jsonify({"error": "Request body must be JSON."}), 400
-
-    if "slides" not in body or not isinstance(body["slides"], list) or len(body["slides"]) == 0:
-        return jsonify({"error": "'slides' must be a non-empty array."}), 400
+    raw = request.get_data(cache=False)
+    try:
+        body = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        body = None
+    error = _validate_generate_body(body)
+    if error:
+        return jsonify({"error": error}), 400
 
     json_data = {
         "presentation_name": body.get("presentation_name", "Presentation"),
@@ -1087,24 +1364,28 @@ def generate():
     }
 
     mode = body.get("mode", "master")
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = _download_stamp()
 
     # ── Built-in master mode ──────────────────────────────────────────────
     if body.get("builtin_id"):
-        safe_id = secure_filename(body["builtin_id"])
+        safe_id = _secure_name(body["builtin_id"])
         # Look up which .pptx file this id maps to
         profile_path = os.path.join(BUILTIN_PROFILES_DIR, f"{safe_id}.json")
         if not os.path.isfile(profile_path):
             return jsonify({"error": f"Built-in master '{safe_id}' not found."}), 404
-        with open(profile_path, "r", encoding="utf-8") as f:
-            meta = json.load(f)
+        meta = _load_json_cached(profile_path)
         pptx_fname = meta.get("pptx", f"{safe_id}.pptx")
         master_path = os.path.join(BUILTIN_MASTER_DIR, pptx_fname)
         if not os.path.isfile(master_path):
             return jsonify({"error": f"PPTX file '{pptx_fname}' missing from master_slide/."}), 404
         schema_layouts = meta.get("layouts", [])
+        digest = _deck_digest(raw, profile_path, master_path)
+        if request.if_none_match.contains(digest):
+            return "", 304, {"ETag": f'"{digest}"'}
         try:
             buf = create_pptx_from_json(json_data, master_path, schema_layouts)
+        except (KeyError, TypeError, ValueError) as exc:
+            return jsonify({"error": f"Invalid slide data: {exc}"}), 400
         except Exception as exc:
             return jsonify({"error": f"Failed to generate PowerPoint: {exc}"}), 500
         out_name = f"{safe_id}_generated_{timestamp}.pptx"
@@ -1112,86 +1393,94 @@ def generate():
     # ── Profile mode: build from master_profile.json (no upload needed) ───────
     elif mode == "profile" or not body.get("filename"):
         # Load pre-scanned schema for MASTER_SLIDE_PATH if available
-        master_schema_path = os.path.splitext(MASTER_SLIDE_PATH)[0] + ".schema.json"
         profile_schema_layouts: list = []
-        if os.path.isfile(master_schema_path):
+        if os.path.isfile(MASTER_SCHEMA_PATH):
             try:
-                with open(master_schema_path, "r", encoding="utf-8") as f:
-                    profile_schema_layouts = json.load(f).get("layouts", [])
+                profile_schema_layouts = _load_json_cached(MASTER_SCHEMA_PATH).get("layouts", [])
             except Exception:
                 pass
+        digest = _deck_digest(raw, MASTER_SLIDE_PATH, MASTER_SCHEMA_PATH)
+        if request.if_none_match.contains(digest):
+            return "", 304, {"ETag": f'"{digest}"'}
         try:
             buf = create_pptx_from_profile(json_data, profile_schema_layouts)
+        except (KeyError, TypeError, ValueError) as exc:
+            return jsonify({"error": f"Invalid slide data: {exc}"}), 400
         except Exception as exc:
             return jsonify({"error": f"Failed to generate PowerPoint: {exc}"}), 500
         out_name = f"presentation_{timestamp}.pptx"
 
     # ── Master mode: use an uploaded .pptx as template ─────────────────────────
     else:
-        filename = secure_filename(body.get("filename", ""))
+        filename = _secure_name(body.get("filename", ""))
         if not filename:
             return jsonify({"error": "'filename' field is required in master mode."}), 400
-        master_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+        stem = os.path.splitext(filename)[0]
+        master_path = os.path.join(UPLOAD_FOLDER, filename)
         if not os.path.isfile(master_path):
             return jsonify({"error": f"Master file '{filename}' not found. Please re-upload."}), 404
         # Load matching schema if it exists
-        upload_schema_path = _schema_json_path(filename)
+        upload_schema_path = _schema_path_for_stem(stem)
         upload_schema_layouts: list = []
         if os.path.isfile(upload_schema_path):
             try:
-                with open(upload_schema_path, "r", encoding="utf-8") as f:
-                    upload_schema_layouts = json.load(f).get("layouts", [])
+                upload_schema_layouts = _load_json_cached(upload_schema_path).get("layouts", [])
             except Exception:
                 pass
+        digest = _deck_digest(raw, master_path, upload_schema_path)
+        if request.if_none_match.contains(digest):
+            return "", 304, {"ETag": f'"{digest}"'}
         try:
             buf = create_pptx_from_json(json_data, master_path, upload_schema_layouts)
+        except (KeyError, TypeError, ValueError) as exc:
+            return jsonify({"error": f"Invalid slide data: {exc}"}), 400
         except Exception as exc:
             return jsonify({"error": f"Failed to generate PowerPoint: {exc}"}), 500
-        out_name = f"{os.path.splitext(filename)[0]}_generated_{timestamp}.pptx"
+        out_name = f"{stem}_generated_{timestamp}.pptx"
 
-    return send_file(
+    resp = send_file(
         buf,
         as_attachment=True,
         download_name=out_name,
-        mimetype="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        mimetype=PPTX_MIME,
     )
+    resp.set_etag(digest)
+    return resp
 
 
 # ── /clear_uploads ───────────────────────────────────────────────────────────
 @app.route("/clear_uploads", methods=["POST"])
 def clear_uploads():
     """Delete ALL files in the uploads folder."""
-    folder = app.config["UPLOAD_FOLDER"]
+    folder = UPLOAD_FOLDER
     deleted = []
     errors = []
     if os.path.isdir(folder):
-        for fname in os.listdir(folder):
-            fpath = os.path.join(folder, fname)
-            if os.path.isfile(fpath):
-                try:
-                    os.remove(fpath)
-                    deleted.append(fname)
-                except Exception as e:
-                    errors.append(f"{fname}: {e}")
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_file():
+                    try:
+                        os.remove(entry.path)
+                        deleted.append(entry.name)
+                    except Exception as e:
+                        errors.append(f"{entry.name}: {e}")
     return jsonify({"ok": True, "deleted": deleted, "errors": errors})
 
 
 @app.route("/cleanup_expired_uploads", methods=["POST"])
 def cleanup_expired_uploads():
     """Delete files in uploads/ that are older than 24 hours."""
-    folder = app.config["UPLOAD_FOLDER"]
+    folder = UPLOAD_FOLDER
     deleted = []
-    now = datetime.datetime.now().timestamp()
+    now = time.time()
     max_age = 24 * 60 * 60  # 24 hours in seconds
     if os.path.isdir(folder):
-        for fname in os.listdir(folder):
-            fpath = os.path.join(folder, fname)
-            if os.path.isfile(fpath):
+        with os.scandir(folder) as it:
+            for entry in it:
                 try:
-                    age = now - os.path.getmtime(fpath)
-                    if age > max_age:
-                        os.remove(fpath)
-                        deleted.append(fname)
+                    if entry.is_file() and now - entry.stat().st_mtime > max_age:
+                        os.remove(entry.path)
+                        deleted.append(entry.name)
                 except Exception:
                     pass
     return jsonify({"ok": True, "deleted": deleted, "count": len(deleted)})
@@ -1202,14 +1491,13 @@ def _startup_cleanup():
     folder = UPLOAD_FOLDER
     if not os.path.isdir(folder):
         return
-    now = datetime.datetime.now().timestamp()
+    now = time.time()
     max_age = 24 * 60 * 60
-    for fname in os.listdir(folder):
-        fpath = os.path.join(folder, fname)
-        if os.path.isfile(fpath):
+    with os.scandir(folder) as it:
+        for entry in it:
             try:
-                if now - os.path.getmtime(fpath) > max_age:
-                    os.remove(fpath)
+                if entry.is_file() and now - entry.stat().st_mtime > max_age:
+                    os.remove(entry.path)
             except Exception:
                 pass
 
@@ -1218,4 +1506,4 @@ def _startup_cleanup():
 if __name__ == "__main__":
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
     _startup_cleanup()
-    app.run(debug=True, host="0.0.0.0", port=5001)
+    app.run(debug=True, host="0.0.0.0", port=5001, threaded=True)
@@ -0,0 +1,15 @@
+"""WSGI entry point for running under a production server.
+
+Example:
+    gunicorn -w $(( $(nproc) * 2 + 1 )) -k gthread --threads 4 \
+        -b 0.0.0.0:5001 wsgi:application
+
+The `python app.py` entry point remains for local debugging only.
+"""
+import os
+
+from app import UPLOAD_FOLDER, _startup_cleanup
+from app import app as application
+
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+_startup_cleanup()